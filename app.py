@@ -1,36 +1,42 @@
-from functools import reduce
-from typing import Dict, Literal, Sequence, TypeVar
+from typing import TYPE_CHECKING, Dict, Literal, Sequence, TypeVar, cast
 
-import altair as alt
 import pandas as pd
 import streamlit as st
-from google.cloud.storage import Client as GcsClient
-from google.oauth2.service_account import Credentials
 from numerize import numerize
 
-from lib.Center import Center
+from lib.Artifact import Artifact
+from lib.Center import read_centers
+from lib.LocalStorage import LocalBucket
 from lib.optn import ages, statuses, waiting_times
-from lib.Report import ReportCollection
+from lib.Report import Report, ReportCollection, ReportKind
+from lib.Snapshot import Snapshot, SnapshotRefresher
 from lib.util import config
+from lib.Waitlist import ChartData, NeighborIndex, Waitlist, WaitlistFilter
 
-client = GcsClient(
-    credentials=Credentials.from_service_account_info(st.secrets['google'])
-)
-collection = ReportCollection(client, client.bucket(config.gcs_bucket))
+if TYPE_CHECKING:
+    import altair as alt
+
+# the loaded snapshot is shared by every session; with copy-on-write, any
+# derived frame that gets modified is copied rather than changing shared data
+# (always on from pandas 3, where the option is deprecated)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 st.set_page_config(layout="wide", page_title='Waitlist explorer')
 
 
-@st.cache_data
-def read_centers():
-    return [
-        Center.from_json(l) for l in open('data/centers_geocoded.jsonl').readlines()
-    ]
+def report_collection() -> ReportCollection:
+    if (bucket_dir := config.local_bucket_dir) is not None:
+        bucket = LocalBucket.from_dir(bucket_dir)
+        return ReportCollection(bucket.client, bucket)
 
+    from google.cloud.storage import Client as GcsClient
+    from google.oauth2.service_account import Credentials
 
-@st.cache_data
-def read_distances():
-    return pd.read_csv("data/centers_distance.txt", delimiter="\t")
+    client = GcsClient(
+        credentials=Credentials.from_service_account_info(st.secrets['google'])
+    )
+    return ReportCollection(client, client.bucket(config.gcs_bucket))
 
 
 T = TypeVar('T')
@@ -40,38 +46,43 @@ def first_and_last(lst: Sequence[T]) -> tuple[T, T]:
     return lst[0], lst[-1]
 
 
-@st.cache_data
-def load_data():
-    centers = read_centers()
-    name_by_code = {c.code: str(c) for c in centers}
-    waitlist_report = collection.get_processed_waitlist()
-    waitlist_report['center'] = waitlist_report['center_code'].map(name_by_code)
-
-    waitlist_report.columns = [
-        c.replace('_', ' ').title() for c in waitlist_report.columns
-    ]
-
-    return [
-        c for c in centers if c.code in waitlist_report['Center Code'].unique()
-    ], waitlist_report
-
+@st.cache_resource
+def snapshot_refresher() -> SnapshotRefresher:
+    initial = None
+    if Artifact.exists():
+        artifact = Artifact.read()
+        centers, neighbors = artifact.centers, artifact.neighbors
+        initial = Snapshot(
+            artifact.report,
+            Waitlist.from_processed(
+                artifact.processed, centers, neighbors, artifact.transplants
+            ),
+        )
+    else:
+        centers = read_centers()
+        neighbors = NeighborIndex.read([c.code for c in centers])
+
+    def build(collection: ReportCollection, report: Report) -> Waitlist:
+        return Waitlist.from_processed(
+            collection.read_processed_report(report),
+            centers,
+            neighbors,
+            collection.get_latest_processed(ReportKind.TRANSPLANT, refresh=True),
+        )
 
-centers, waitlist_report = load_data()
-distances = read_distances()
+    return SnapshotRefresher(
+        report_collection, build, config.refresh_interval_s, initial=initial
+    ).start()
 
 
-x_order: Dict[str, Sequence[str]] = {
-    'Status': list(reversed(statuses)),
-    'Age': ages,
-    'Waiting Time': waiting_times,
-    'Center': [str(c) for c in centers],
-}
+snapshot = snapshot_refresher().current
+waitlist = snapshot.waitlist
 
-color_order: Dict[str, Sequence[str]] = {
-    'Status': list(reversed(statuses)),
-    'Age': list(reversed(ages)),
-    'Waiting Time': waiting_times,
-    'Center': [str(c) for c in centers],
+x_order: Dict[str, Literal['ascending', 'descending']] = {
+    'Status': 'descending',
+    'Age': 'ascending',
+    'Waiting Time': 'ascending',
+    'Center': 'ascending',
 }
 
 col_type: Dict[str, Literal['ordinal', 'nominal']] = {
@@ -81,50 +92,62 @@ col_type: Dict[str, Literal['ordinal', 'nominal']] = {
     'Center': 'nominal',
 }
 
+cols = ['Age', 'Waiting Time', 'Status', 'Center']
+
+# centers beyond this are folded into a single "Other" bar or color
+max_chart_centers = 40
+
 
-def summary_chart(frame: pd.DataFrame, group_by: str, color_by: str):
+def summary_chart(data: ChartData, group_by: str, color_by: str) -> "alt.Chart":
+    """Bar chart over integer-coded data, joined to its labels in the browser.
 
-    return (
-        alt.Chart(
-            frame.groupby([group_by, color_by], observed=True)['Count']
-            .sum()
-            .reset_index()
+    Only the small label lists are inlined in the spec; the coded rows travel
+    as the chart's dataset, which keeps the payload bounded for many centers.
+    """
+    import altair as alt
+
+    def labels(code: str, field: str, values: list[str]) -> alt.LookupData:
+        return alt.LookupData(
+            alt.InlineData(values=[{code: i, field: v} for i, v in enumerate(values)]),
+            key=code,
+            fields=[field],
+        )
+
+    chart: alt.Chart = (
+        alt.Chart(data.values)
+        .transform_lookup(
+            lookup='group', from_=labels('group', group_by, data.group_labels)
+        )
+        .transform_lookup(
+            lookup='color', from_=labels('color', color_by, data.color_labels)
         )
         .mark_bar()
         .encode(
-            alt.X(group_by, type=col_type[group_by], sort=x_order[group_by]),
+            alt.X(
+                group_by,
+                type=col_type[group_by],
+                sort=alt.EncodingSortField('group', op='min', order=x_order[group_by]),
+            ),
             alt.Y('Count', title='Number of waitlist patients'),
             alt.Color(
                 color_by,
                 type=col_type[color_by],
+                sort=alt.EncodingSortField('color', op='min'),
             ),
-            alt.Order(field=group_by),
+            alt.Order('color'),
         )
         .properties(height=600)
         .interactive()
     )
+    return chart
 
 
-def centers_in_radius(center_code: str, radius_nm: float) -> list[str]:
-    others = (
-        distances.loc[
-            (distances['source'] == center_code)
-            & (distances['distance_nm'] <= radius_nm),
-            'target',
-        ]
-        .unique()
-        .tolist()
-    )
-    return [center_code] + others
-
-
-def filter_data(
-    report: pd.DataFrame,
-) -> pd.DataFrame:
-    st.sidebar.header("Filter waitlist")
-    center_input = st.sidebar.selectbox(
+@st.fragment
+def filter_sidebar() -> None:
+    st.header("Filter waitlist")
+    center_input = st.selectbox(
         "Center",
-        centers,
+        waitlist.centers,
         index=None,
         placeholder="Select a center",
         format_func=lambda c: str(c),
@@ -132,12 +155,12 @@ def filter_data(
 
     max_distance = None
     if center_input:
-        include_radius_toggle = st.sidebar.toggle(
+        include_radius_toggle = st.toggle(
             "Include other centers in radius",
             value=False,
         )
         if include_radius_toggle:
-            max_distance = st.sidebar.slider(
+            max_distance = st.slider(
                 "Radius (nautical miles)",
                 min_value=0,
                 max_value=1000,
@@ -145,69 +168,108 @@ def filter_data(
                 step=50,
             )
 
-    status_input = st.sidebar.select_slider(
+    status_input = st.select_slider(
         "Status", statuses, value=('Status 1A', 'MELD/PELD <15')
     )
-    age_input = st.sidebar.select_slider("Age", ages, value=first_and_last(ages))
-    waiting_time_input = st.sidebar.select_slider(
+    age_input = st.select_slider("Age", ages, value=first_and_last(ages))
+    waiting_time_input = st.select_slider(
         "Waiting Time", waiting_times, value=first_and_last(waiting_times)
     )
 
-    conditions = [
-        report['Age'].between(*age_input),
-        report['Waiting Time'].between(*waiting_time_input),
-        report['Status'].between(*status_input),
-    ]
+    current = WaitlistFilter(
+        center_code=center_input.code if center_input else None,
+        radius_nm=max_distance,
+        status=status_input,
+        age=age_input,
+        waiting_time=waiting_time_input,
+    ).normalized()
+
+    # A full app run renders the metrics and chart after this fragment, so
+    # only a fragment-scoped rerun needs to push a changed filter onward.
+    app_run = st.session_state.pop('app_run', False)
+    if st.session_state.get('filter') != current:
+        st.session_state['filter'] = current
+        if not app_run:
+            st.rerun(scope="app")
+
+
+@st.fragment(run_every=60)
+def snapshot_caption() -> None:
+    if snapshot_refresher().current is not snapshot:
+        st.rerun(scope="app")
+    st.caption(f"Data retrieved {snapshot.retrieved.strftime('%Y-%m-%d %H:%M')}")
+
+
+@st.fragment
+def metrics() -> None:
+    f = st.session_state['filter']
+    patients, n_centers = waitlist.totals(f)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(
+        label="Waitlist patients",
+        value=numerize.numerize(float(patients)),
+        help='Number of patients on the waitlist',
+    )
+    col2.metric(
+        label="Transplant centers",
+        value=numerize.numerize(n_centers),
+        help='Number of transplant centers',
+    )
 
-    if center_input:
-        code = center_input.code
-        if max_distance is not None:
-            conditions.append(
-                report['Center Code'].isin(centers_in_radius(code, max_distance))
-            )
-        else:
-            conditions.append(report['Center Code'] == code)
+    if (transplants := waitlist.transplants(f)) is not None:
+        waitlisted, transplanted = transplants
+        year = waitlist.transplant_year
+        period = f"in {year}" if year is not None else "per year"
+        col3.metric(
+            label=f"Transplants {period}",
+            value=numerize.numerize(transplanted),
+            help=f'Deceased donor transplants {period} at the selected centers '
+            'and statuses, across all ages',
+        )
+        col4.metric(
+            label="Transplants per 100 waitlisted",
+            value=f"{100 * transplanted / waitlisted:.1f}" if waitlisted else "-",
+            help=f'Transplants {period} per 100 patients on the current waitlist '
+            'at the selected centers and statuses, across all ages and waiting '
+            'times',
+        )
 
-    return report.loc[
-        reduce(lambda x, y: x & y, conditions),
-        ['Center', 'Age', 'Waiting Time', 'Status', 'Count'],
-    ]
 
+@st.fragment
+def chart() -> None:
+    col1, col2 = st.columns(2)
+    # with an index set, a selectbox always has a value
+    group_by = cast(str, col1.selectbox("Group by", cols, index=0))
+    color_by = cast(
+        str, col2.selectbox("Color by", [c for c in cols if c != group_by], index=1)
+    )
 
-df = filter_data(waitlist_report)
-cols = ['Age', 'Waiting Time', 'Status', 'Center']
+    st.altair_chart(
+        summary_chart(
+            waitlist.chart_data(
+                st.session_state['filter'], group_by, color_by, max_chart_centers
+            ),
+            group_by,
+            color_by,
+        ),
+        use_container_width=True,
+    )
+
+
+st.session_state['app_run'] = True
+with st.sidebar:
+    filter_sidebar()
 
 st.markdown(
     """
     # Waitlist explorer
     """
 )
+snapshot_caption()
 
-col1, col2 = st.columns(2)
-
-
-with col1:
-    st.metric(
-        label="Waitlist patients",
-        value=numerize.numerize(df['Count'].astype(float).sum()),
-        help='Number of patients on the waitlist',
-    )
-
-    group_by = col1.selectbox("Group by", cols, index=0)
-
-with col2:
-    st.metric(
-        label="Transplant centers",
-        value=numerize.numerize(df['Center'].nunique()),
-        help='Number of transplant centers',
-    )
-    color_by = col2.selectbox("Color by", [c for c in cols if c != group_by], index=1)
-
-
-st.altair_chart(
-    summary_chart(df, group_by, color_by),
-    use_container_width=True,
-)
+metrics()
+chart()
 
 # """
 # * same identifiers
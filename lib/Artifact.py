@@ -0,0 +1,161 @@
+import shutil
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import ClassVar, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from lib.Center import Center, read_centers
+from lib.Report import Report, ReportCollection, ReportKind
+from lib.Store import Dictionaries
+from lib.util import config, getLogger
+from lib.Waitlist import NeighborIndex
+
+logger = getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """Everything the app needs at startup, prebuilt as memory-mapped Arrow files."""
+
+    report: Report
+    processed: pd.DataFrame
+    centers: list[Center]
+    neighbors: NeighborIndex
+    transplants: Optional[pd.DataFrame] = None
+
+    waitlist_file: ClassVar[str] = "waitlist.arrow"
+    centers_file: ClassVar[str] = "centers.arrow"
+    transplant_file: ClassVar[str] = "transplant.arrow"
+
+    @classmethod
+    def build(cls, collection: ReportCollection) -> "Artifact":
+        """Assemble from the latest processed report and the local data files."""
+        report = collection.find_latest_report()
+        centers = read_centers()
+        return cls(
+            report,
+            collection.read_processed_report(report),
+            centers,
+            NeighborIndex.read([c.code for c in centers]),
+            collection.get_latest_processed(ReportKind.TRANSPLANT),
+        )
+
+    @classmethod
+    def exists(cls, path: Path = config.snapshot_dir) -> bool:
+        return all((path / f).exists() for f in (cls.waitlist_file, cls.centers_file))
+
+    @classmethod
+    def owns(cls, path: Path) -> bool:
+        """Whether `path` is a directory holding nothing but artifact files."""
+        files = {cls.waitlist_file, cls.centers_file, cls.transplant_file}
+        return path.is_dir() and all(p.name in files for p in path.iterdir())
+
+    def write(self, path: Path = config.snapshot_dir) -> None:
+        if path.exists() and not self.owns(path):
+            raise FileExistsError(
+                f"{path} holds files other than a snapshot artifact; "
+                "refusing to replace it"
+            )
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+        # mkdtemp makes it private, but it becomes the artifact directory
+        staging.chmod(0o755)
+        try:
+            self._write_files(staging)
+        except BaseException:
+            shutil.rmtree(staging)
+            raise
+
+        # swap the whole directory: readers see the old files, the new files or
+        # no artifact at all, never a mix
+        if path.exists():
+            previous = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+            path.replace(previous)
+            staging.rename(path)
+            shutil.rmtree(previous)
+        else:
+            staging.rename(path)
+
+        logger.info(f"Wrote artifact for {self.report.remote_path} to {path}")
+
+    def _write_files(self, path: Path) -> None:
+        dictionaries = Dictionaries.for_reports(
+            [c.code for c in self.centers], self.processed, self.transplants
+        )
+
+        waitlist = pa.Table.from_pandas(
+            dictionaries.encode(self.processed), preserve_index=False
+        )
+        waitlist = waitlist.replace_schema_metadata(
+            {
+                **(waitlist.schema.metadata or {}),
+                b"remote_path": self.report.remote_path.encode(),
+            }
+        )
+        _write_ipc(path / self.waitlist_file, waitlist)
+
+        if self.transplants is not None:
+            _write_ipc(
+                path / self.transplant_file,
+                pa.Table.from_pandas(
+                    dictionaries.encode(self.transplants), preserve_index=False
+                ),
+            )
+
+        n = self.neighbors
+        centers = pa.Table.from_pylist([asdict(c) for c in self.centers])
+        if centers['code'].to_pylist() != n.codes.tolist():
+            raise ValueError("Neighbor index is not aligned with the center table")
+        centers = centers.append_column(
+            "neighbor", pa.ListArray.from_arrays(n.offsets, n.targets)
+        ).append_column(
+            "neighbor_distance_nm", pa.ListArray.from_arrays(n.offsets, n.distance_nm)
+        )
+        _write_ipc(path / self.centers_file, centers)
+
+    @classmethod
+    def read(cls, path: Path = config.snapshot_dir) -> "Artifact":
+        waitlist = _read_ipc(path / cls.waitlist_file)
+        centers = _read_ipc(path / cls.centers_file)
+
+        neighbor = centers['neighbor'].combine_chunks()
+        neighbor_distance_nm = centers['neighbor_distance_nm'].combine_chunks()
+        neighbors = NeighborIndex(
+            np.array(centers['code'].to_pylist(), dtype=object),
+            neighbor.offsets.to_numpy(),
+            neighbor.values.to_numpy(),
+            neighbor_distance_nm.values.to_numpy(),
+        )
+
+        return cls(
+            Report.from_remote_path(waitlist.schema.metadata[b"remote_path"].decode()),
+            waitlist.to_pandas(split_blocks=True),
+            [
+                Center(**row)
+                for row in centers.drop_columns(
+                    ["neighbor", "neighbor_distance_nm"]
+                ).to_pylist()
+            ],
+            neighbors,
+            (
+                _read_ipc(path / cls.transplant_file).to_pandas(split_blocks=True)
+                if (path / cls.transplant_file).exists()
+                else None
+            ),
+        )
+
+
+def _write_ipc(path: Path, table: pa.Table) -> None:
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_ipc(path: Path) -> pa.Table:
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).read_all()
@@ -1,5 +1,8 @@
 import json
 from dataclasses import dataclass
+from pathlib import Path
+
+from lib.util import config
 
 
 @dataclass
@@ -17,3 +20,10 @@ class Center:
     @classmethod
     def from_json(cls, json_str):
         return cls(**json.loads(json_str))
+
+
+def read_centers(
+    path: Path = config.data_dir / "centers_geocoded.jsonl",
+) -> list[Center]:
+    with open(path) as f:
+        return [Center.from_json(line) for line in f]
@@ -0,0 +1,78 @@
+import gzip
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+# GCS keeps Content-Encoding with the object; here it goes in a file beside it
+ENCODING_SUFFIX = ".encoding"
+
+
+@dataclass
+class LocalBlob:
+    bucket: "LocalBucket"
+    name: str
+    chunk_size: Optional[int] = None
+    content_encoding: Optional[str] = None
+
+    @property
+    def path(self) -> Path:
+        return self.bucket.root / self.name
+
+    @property
+    def encoding_path(self) -> Path:
+        return self.path.with_name(self.path.name + ENCODING_SUFFIX)
+
+    def download_to_filename(self, filename: str) -> None:
+        # like GCS decompressive transcoding: gzip-encoded objects come back decoded
+        encoding = None
+        if self.encoding_path.exists():
+            encoding = self.encoding_path.read_text()
+        opener: Any = gzip.open if encoding == "gzip" else open
+        with opener(self.path, "rb") as src, open(filename, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+    def upload_from_filename(self, filename: str, **kwargs: Any) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        shutil.copyfile(filename, tmp_path)
+        if self.content_encoding is None:
+            self.encoding_path.unlink(missing_ok=True)
+        else:
+            tmp_encoding = self.encoding_path.with_name(
+                self.encoding_path.name + ".tmp"
+            )
+            tmp_encoding.write_text(self.content_encoding)
+            tmp_encoding.replace(self.encoding_path)
+        tmp_path.replace(self.path)
+
+
+@dataclass(frozen=True)
+class LocalBucket:
+    """A directory standing in for a GCS bucket, for running without GCP."""
+
+    root: Path
+
+    @classmethod
+    def from_dir(cls, path: Path) -> "LocalBucket":
+        return LocalClient(path.parent).bucket(path.name)
+
+    @property
+    def client(self) -> "LocalClient":
+        return LocalClient(self.root.parent)
+
+    def blob(self, name: str, chunk_size: Optional[int] = None) -> LocalBlob:
+        return LocalBlob(self, name, chunk_size=chunk_size)
+
+
+@dataclass(frozen=True)
+class LocalClient:
+    root: Path
+
+    def bucket(self, name: str) -> LocalBucket:
+        return LocalBucket(self.root / name)
+
+    def list_blobs(self, bucket: LocalBucket, match_glob: str) -> Iterator[LocalBlob]:
+        for path in sorted(bucket.root.glob(match_glob)):
+            if path.is_file() and path.suffix != ENCODING_SUFFIX:
+                yield bucket.blob(path.relative_to(bucket.root).as_posix())
@@ -1,21 +1,26 @@
+from __future__ import annotations
+
 import enum
 import tempfile
 from contextlib import contextmanager
 from dataclasses import dataclass, field
 from datetime import date, datetime
 from pathlib import Path
-from typing import ClassVar, Iterator, Optional
+from typing import TYPE_CHECKING, ClassVar, Iterator, Optional
 
 import pandas as pd
-from google.cloud.storage import Bucket, Client
 
 from lib.util import Environment, config, getLogger
 
+if TYPE_CHECKING:
+    from google.cloud.storage import Bucket, Client
+
 logger = getLogger(__name__)
 
 
 class ReportKind(enum.Enum):
     WAITLIST = "waitlist"
+    TRANSPLANT = "transplant"
 
 
 class ReportStatus(enum.Enum):
@@ -77,9 +82,10 @@ class ReportCollection:
         kind: ReportKind = ReportKind.WAITLIST,
         status: ReportStatus = ReportStatus.PROCESSED,
         d: Optional[date] = None,
+        refresh: bool = False,
     ) -> list[Report]:
         key = (kind, status, d)
-        if key not in self._reports:
+        if refresh or key not in self._reports:
             glob = "/".join(
                 [
                     config.env.value,
@@ -99,11 +105,21 @@ class ReportCollection:
         kind: ReportKind = ReportKind.WAITLIST,
         status: ReportStatus = ReportStatus.PROCESSED,
         d: Optional[date] = None,
+        refresh: bool = False,
     ) -> Report:
-        reports = self.reports(kind, status, d)
+        reports = self.reports(kind, status, d, refresh=refresh)
         reports.sort(key=lambda r: r.datetime_retrieved, reverse=True)
         return reports[0]
 
+    @contextmanager
+    def download_report(self, report: Report) -> Iterator[Path]:
+        local_path = Path(tempfile.mkstemp(suffix=f".{report.status.extension}")[1])
+        try:
+            report.download(self.bucket, local_path)
+            yield local_path
+        finally:
+            local_path.unlink(missing_ok=True)
+
     @contextmanager
     def download_latest_report(
         self,
@@ -113,17 +129,26 @@ class ReportCollection:
         d: Optional[date] = None,
     ) -> Iterator[Path]:
         report = self.find_latest_report(kind=kind, status=status, d=d)
-        local_path = Path(tempfile.mkstemp(suffix=f".{status.extension}")[1])
-        try:
-            report.download(self.bucket, local_path)
+        with self.download_report(report) as local_path:
             yield local_path
-        finally:
-            local_path.unlink(missing_ok=True)
 
-    def get_processed_waitlist(self, d: Optional[date] = None) -> pd.DataFrame:
-        with self.download_latest_report(
-            kind=ReportKind.WAITLIST,
-            status=ReportStatus.PROCESSED,
-            d=d,
-        ) as local_path:
+    def read_processed_report(self, report: Report) -> pd.DataFrame:
+        with self.download_report(report) as local_path:
             return pd.read_parquet(local_path)
+
+    def get_latest_processed(
+        self, kind: ReportKind, refresh: bool = False
+    ) -> Optional[pd.DataFrame]:
+        """The latest processed report of `kind`, or None if there is none yet."""
+        if not self.reports(kind, ReportStatus.PROCESSED, refresh=refresh):
+            return None
+        return self.read_processed_report(self.find_latest_report(kind=kind))
+
+    def get_processed_waitlist(self, d: Optional[date] = None) -> pd.DataFrame:
+        return self.read_processed_report(
+            self.find_latest_report(
+                kind=ReportKind.WAITLIST,
+                status=ReportStatus.PROCESSED,
+                d=d,
+            )
+        )
@@ -0,0 +1,96 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from lib.Report import Report, ReportCollection, ReportKind, ReportStatus
+from lib.util import getLogger
+from lib.Waitlist import Waitlist
+
+logger = getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    report: Report
+    waitlist: Waitlist
+
+    @property
+    def retrieved(self) -> datetime:
+        return self.report.datetime_retrieved
+
+
+class SnapshotRefresher:
+    """Keeps the latest processed waitlist loaded, refreshing in the background."""
+
+    def __init__(
+        self,
+        collection: Callable[[], ReportCollection],
+        build: Callable[[ReportCollection, Report], Waitlist],
+        interval_s: float,
+        initial: Optional[Snapshot] = None,
+    ):
+        self.make_collection = collection
+        self.build = build
+        self.interval_s = interval_s
+
+        self._collection: Optional[ReportCollection] = None
+        self._current = initial
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def collection(self) -> ReportCollection:
+        if self._collection is None:
+            self._collection = self.make_collection()
+        return self._collection
+
+    @property
+    def current(self) -> Snapshot:
+        if self._current is None:
+            raise RuntimeError("SnapshotRefresher has not loaded a snapshot yet")
+        return self._current
+
+    def start(self) -> "SnapshotRefresher":
+        """Load the latest snapshot unless seeded, then poll for newer ones."""
+        # a seeded snapshot may already be stale, so check right away
+        poll_now = self._current is not None
+        if self._current is None:
+            self.refresh()
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(poll_now,),
+                name="snapshot-refresher",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def refresh(self) -> bool:
+        """Swap in the latest report if it is newer than the current one."""
+        latest = self.collection.find_latest_report(
+            kind=ReportKind.WAITLIST, status=ReportStatus.PROCESSED, refresh=True
+        )
+        current = self._current
+        if current is not None and latest.datetime_retrieved <= current.retrieved:
+            return False
+
+        logger.info(f"Loading snapshot {latest.remote_path}")
+        self._current = Snapshot(latest, self.build(self.collection, latest))
+        return True
+
+    def _run(self, poll_now: bool) -> None:
+        if poll_now:
+            self._try_refresh()
+        while not self._stop.wait(self.interval_s):
+            self._try_refresh()
+
+    def _try_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Snapshot refresh failed; keeping current snapshot")
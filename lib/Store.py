@@ -0,0 +1,135 @@
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from lib.optn import ages, statuses
+
+
+def freeze(*arrays: np.ndarray) -> None:
+    """Make arrays read-only, since one loaded snapshot serves every session of
+    the process and a stray in-place write would leak between them."""
+    for array in arrays:
+        array.setflags(write=False)
+
+
+@dataclass(frozen=True)
+class Dictionaries:
+    """Category dictionaries shared by every report kind.
+
+    Encoding waitlist and transplant reports against the same dictionaries
+    makes their integer codes interchangeable, so the two can be joined by
+    indexing arrays instead of merging on strings.
+    """
+
+    centers: list[str]
+    ages: list[str] = field(default_factory=lambda: list(ages))
+    statuses: list[str] = field(default_factory=lambda: list(statuses))
+
+    @classmethod
+    def for_reports(
+        cls, center_codes: list[str], *reports: Optional[pd.DataFrame]
+    ) -> "Dictionaries":
+        """Known centers first, then any other center found in `reports`."""
+        known = set(center_codes)
+        extra: set[str] = set()
+        for report in reports:
+            if report is not None:
+                extra.update(str(c) for c in report['center_code'].dropna().unique())
+        return cls(list(center_codes) + sorted(extra - known))
+
+    def encode(self, report: pd.DataFrame) -> pd.DataFrame:
+        """Recode center, age and status of a processed report as categoricals.
+
+        Columns already encoded with these dictionaries are kept as they are,
+        so a report read from the snapshot artifact is not copied.
+        """
+        return report.assign(
+            center_code=_recode(report['center_code'], self.centers, ordered=False),
+            age=_recode(report['age'], self.ages, ordered=True),
+            status=_recode(report['status'], self.statuses, ordered=True),
+        )
+
+
+def _recode(values: pd.Series, categories: list[str], ordered: bool) -> pd.Series:
+    if (
+        isinstance(values.dtype, pd.CategoricalDtype)
+        and values.cat.ordered == ordered
+        and values.cat.categories.tolist() == categories
+    ):
+        return values
+    return pd.Series(
+        pd.Categorical(values.astype(object), categories=categories, ordered=ordered),
+        index=values.index,
+    )
+
+
+class CenterStatusRates:
+    """Waitlist and transplant counts as dense `centers x statuses` arrays."""
+
+    def __init__(
+        self,
+        dictionaries: Dictionaries,
+        waitlist: np.ndarray,
+        transplants: np.ndarray,
+        year: Optional[int] = None,
+    ):
+        self.dictionaries = dictionaries
+        self.waitlist = waitlist
+        self.transplants = transplants
+        self.year = year
+        freeze(waitlist, transplants)
+        self._center_index = {c: i for i, c in enumerate(dictionaries.centers)}
+
+    @classmethod
+    def from_reports(
+        cls,
+        dictionaries: Dictionaries,
+        waitlist: pd.DataFrame,
+        transplants: pd.DataFrame,
+    ) -> "CenterStatusRates":
+        """Build from processed reports already encoded with `dictionaries`."""
+        shape = (len(dictionaries.centers), len(dictionaries.statuses))
+        return cls(
+            dictionaries,
+            _count_by_center_status(waitlist, shape),
+            _count_by_center_status(transplants, shape),
+            int(transplants['year'].max()) if 'year' in transplants else None,
+        )
+
+    def lookup(
+        self, center_codes: Optional[list[str]], status: tuple[str, str]
+    ) -> tuple[int, int]:
+        """Waitlist patients and transplants for the centers and status range.
+
+        `center_codes=None` means every center.
+        """
+        lo = self.dictionaries.statuses.index(status[0])
+        hi = self.dictionaries.statuses.index(status[1]) + 1
+
+        rows: Union[slice, np.ndarray] = slice(None)
+        if center_codes is not None:
+            rows = np.asarray(
+                [
+                    self._center_index[c]
+                    for c in center_codes
+                    if c in self._center_index
+                ],
+                dtype=np.intp,
+            )
+
+        return (
+            int(self.waitlist[rows, lo:hi].sum()),
+            int(self.transplants[rows, lo:hi].sum()),
+        )
+
+
+def _count_by_center_status(report: pd.DataFrame, shape: tuple[int, int]) -> np.ndarray:
+    center = report['center_code'].cat.codes.to_numpy()
+    status = report['status'].cat.codes.to_numpy()
+    known = (center >= 0) & (status >= 0)
+
+    counts = np.zeros(shape, dtype=np.int64)
+    np.add.at(counts, (center[known], status[known]), report['count'].to_numpy()[known])
+    return counts
@@ -0,0 +1,287 @@
+from dataclasses import dataclass, replace
+from functools import lru_cache, reduce
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from lib.Center import Center
+from lib.optn import ages, statuses, waiting_times
+from lib.Store import CenterStatusRates, Dictionaries, freeze
+from lib.util import config
+
+
+@dataclass(frozen=True)
+class WaitlistFilter:
+    center_code: Optional[str] = None
+    radius_nm: Optional[float] = None
+    status: tuple[str, str] = ('Status 1A', 'MELD/PELD <15')
+    age: tuple[str, str] = (ages[0], ages[-1])
+    waiting_time: tuple[str, str] = (waiting_times[0], waiting_times[-1])
+
+    def normalized(self) -> "WaitlistFilter":
+        """Canonical form, so equivalent filters share a cache entry."""
+        radius = None
+        if self.center_code is not None and self.radius_nm is not None:
+            radius = float(self.radius_nm)
+        return replace(
+            self,
+            radius_nm=radius,
+            status=_ordered(self.status, statuses),
+            age=_ordered(self.age, ages),
+            waiting_time=_ordered(self.waiting_time, waiting_times),
+        )
+
+
+def _ordered(bounds: tuple[str, str], order: list[str]) -> tuple[str, str]:
+    lo, hi = bounds
+    return (lo, hi) if order.index(lo) <= order.index(hi) else (hi, lo)
+
+
+class NeighborIndex:
+    """Every center's neighbors sorted by distance, so radius lookups are a bisect.
+
+    Stored CSR-style: the neighbors of `codes[i]` are
+    `codes[targets[offsets[i]:offsets[i + 1]]]`, which maps directly onto an
+    Arrow list column.
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        offsets: np.ndarray,
+        targets: np.ndarray,
+        distance_nm: np.ndarray,
+    ):
+        self.codes = codes
+        self.offsets = offsets
+        self.targets = targets
+        self.distance_nm = distance_nm
+        freeze(codes, offsets, targets, distance_nm)
+        self._position = {str(code): i for i, code in enumerate(codes)}
+
+    @classmethod
+    def from_distances(
+        cls, distances: pd.DataFrame, codes: list[str]
+    ) -> "NeighborIndex":
+        """Build from a source/target/distance_nm table, restricted to `codes`."""
+        position = {code: i for i, code in enumerate(codes)}
+        edges = distances.assign(
+            source_idx=distances['source'].map(position),
+            target_idx=distances['target'].map(position),
+        ).dropna(subset=['source_idx', 'target_idx'])
+        edges = edges.sort_values(['source_idx', 'distance_nm'], kind='stable')
+
+        counts = np.bincount(
+            edges['source_idx'].to_numpy(dtype=np.int64), minlength=len(codes)
+        )
+        offsets = np.zeros(len(codes) + 1, dtype=np.int32)
+        np.cumsum(counts, out=offsets[1:])
+
+        return cls(
+            np.array(codes, dtype=object),
+            offsets,
+            edges['target_idx'].to_numpy(dtype=np.int32),
+            edges['distance_nm'].to_numpy(dtype=np.float64),
+        )
+
+    @classmethod
+    def read(
+        cls, codes: list[str], path: Path = config.data_dir / "centers_distance.txt"
+    ) -> "NeighborIndex":
+        return cls.from_distances(pd.read_csv(path, delimiter="\t"), codes)
+
+    def within(self, center_code: str, radius_nm: float) -> list[str]:
+        if center_code not in self._position:
+            return [center_code]
+        i = self._position[center_code]
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        n = int(np.searchsorted(self.distance_nm[lo:hi], radius_nm, side='right'))
+        neighbors: list[str] = self.codes[self.targets[lo : lo + n]].tolist()
+        return [center_code] + neighbors
+
+
+class Waitlist:
+    """A processed waitlist report with memoized filter and summary queries.
+
+    Cached frames are shared between callers and must not be mutated.
+    """
+
+    columns = ['Center', 'Age', 'Waiting Time', 'Status', 'Count']
+
+    def __init__(
+        self,
+        report: pd.DataFrame,
+        centers: list[Center],
+        neighbors: NeighborIndex,
+        rates: Optional[CenterStatusRates] = None,
+        cache_size: int = 64,
+    ):
+        self.report = report
+        self.centers = centers
+        self.neighbors = neighbors
+        self.rates = rates
+        self.center_labels = [str(c) for c in centers]
+
+        self._filter = lru_cache(maxsize=cache_size)(self._filter_uncached)
+        self._totals = lru_cache(maxsize=cache_size)(self._totals_uncached)
+        self._summarize = lru_cache(maxsize=cache_size)(self._summarize_uncached)
+        self._chart_data = lru_cache(maxsize=cache_size)(self._chart_data_uncached)
+        self._transplants = lru_cache(maxsize=cache_size)(self._transplants_uncached)
+
+    @classmethod
+    def from_processed(
+        cls,
+        processed: pd.DataFrame,
+        centers: list[Center],
+        neighbors: NeighborIndex,
+        transplants: Optional[pd.DataFrame] = None,
+    ) -> "Waitlist":
+        """Build from processed reports as written by the scraper."""
+        dictionaries = Dictionaries.for_reports(
+            [c.code for c in centers], processed, transplants
+        )
+        report = dictionaries.encode(
+            processed.drop(columns=['retrieved_dt'], errors='ignore')
+        )
+        rates = None
+        if transplants is not None:
+            rates = CenterStatusRates.from_reports(
+                dictionaries, report, dictionaries.encode(transplants)
+            )
+
+        codes = set(report['center_code'].dropna().unique())
+        centers = [c for c in centers if c.code in codes]
+        report['center'] = pd.Categorical(
+            report['center_code'].map({c.code: str(c) for c in centers}),
+            categories=[str(c) for c in centers],
+        )
+        report.columns = [c.replace('_', ' ').title() for c in report.columns]
+
+        return cls(report, centers, neighbors, rates)
+
+    def filter(self, f: WaitlistFilter) -> pd.DataFrame:
+        return self._filter(f.normalized())
+
+    def totals(self, f: WaitlistFilter) -> tuple[int, int]:
+        """Number of patients and number of distinct centers matching `f`."""
+        return self._totals(f.normalized())
+
+    def summarize(
+        self, f: WaitlistFilter, group_by: str, color_by: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Patient counts by `group_by`, and by `color_by` within it if given."""
+        return self._summarize(f.normalized(), group_by, color_by)
+
+    def chart_data(
+        self, f: WaitlistFilter, group_by: str, color_by: str, max_centers: int
+    ) -> "ChartData":
+        return self._chart_data(f.normalized(), group_by, color_by, max_centers)
+
+    def transplants(self, f: WaitlistFilter) -> Optional[tuple[int, int]]:
+        """Waitlist patients and transplants per year for the centers and
+        statuses in `f`, over all ages and waiting times.
+
+        None when no transplant report was loaded.
+        """
+        return self._transplants(f.normalized())
+
+    @property
+    def transplant_year(self) -> Optional[int]:
+        """Year the transplant counts cover, if known."""
+        return self.rates.year if self.rates is not None else None
+
+    def _center_codes(self, f: WaitlistFilter) -> Optional[list[str]]:
+        """Centers selected by `f`, or None for all of them."""
+        if f.center_code is None:
+            return None
+        if f.radius_nm is None:
+            return [f.center_code]
+        return self.neighbors.within(f.center_code, f.radius_nm)
+
+    def _filter_uncached(self, f: WaitlistFilter) -> pd.DataFrame:
+        report = self.report
+        conditions = [
+            report['Age'].between(*f.age),
+            report['Waiting Time'].between(*f.waiting_time),
+            report['Status'].between(*f.status),
+        ]
+
+        codes = self._center_codes(f)
+        if codes is not None:
+            conditions.append(report['Center Code'].isin(codes))
+
+        return report.loc[reduce(lambda x, y: x & y, conditions), self.columns]
+
+    def _totals_uncached(self, f: WaitlistFilter) -> tuple[int, int]:
+        frame = self._filter(f)
+        return int(frame['Count'].sum()), int(frame['Center'].nunique())
+
+    def _transplants_uncached(self, f: WaitlistFilter) -> Optional[tuple[int, int]]:
+        if self.rates is None:
+            return None
+        return self.rates.lookup(self._center_codes(f), f.status)
+
+    def _summarize_uncached(
+        self, f: WaitlistFilter, group_by: str, color_by: Optional[str]
+    ) -> pd.DataFrame:
+        columns = [group_by] if color_by is None else [group_by, color_by]
+        return (
+            self._filter(f).groupby(columns, observed=True)['Count'].sum().reset_index()
+        )
+
+    def _chart_data_uncached(
+        self, f: WaitlistFilter, group_by: str, color_by: str, max_centers: int
+    ) -> "ChartData":
+        frame = self._summarize(f, group_by, color_by)
+        if 'Center' in (group_by, color_by):
+            frame = _bucket_centers(frame, group_by, color_by, max_centers)
+
+        group = frame[group_by].cat.remove_unused_categories()
+        color = frame[color_by].cat.remove_unused_categories()
+        return ChartData(
+            pd.DataFrame(
+                {
+                    'group': group.cat.codes,
+                    'color': color.cat.codes,
+                    'Count': frame['Count'].astype('int32'),
+                }
+            ),
+            group.cat.categories.tolist(),
+            color.cat.categories.tolist(),
+        )
+
+
+@dataclass(frozen=True)
+class ChartData:
+    """Summary counts with integer-coded groups, plus the labels for each code.
+
+    Codes follow category order, so sorting by code keeps the natural order of
+    ages, waiting times, statuses and centers.
+    """
+
+    values: pd.DataFrame
+    group_labels: list[str]
+    color_labels: list[str]
+
+
+def _bucket_centers(
+    summary: pd.DataFrame, group_by: str, color_by: str, max_centers: int
+) -> pd.DataFrame:
+    """Keep the `max_centers` largest centers and fold the rest into one bucket."""
+    totals = summary.groupby('Center', observed=True)['Count'].sum()
+    if len(totals) <= max_centers:
+        return summary
+
+    keep = totals.nlargest(max_centers).index
+    other = f"Other ({len(totals) - max_centers} centers)"
+    categories = [c for c in summary['Center'].cat.categories if c in keep]
+    center = summary['Center'].cat.set_categories(categories + [other])
+
+    return (
+        summary.assign(Center=center.fillna(other))
+        .groupby([group_by, color_by], observed=True)['Count']
+        .sum()
+        .reset_index()
+    )
@@ -0,0 +1,282 @@
+import io
+import json
+import math
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Hashable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pyarrow as pa
+
+from lib.optn import ages, statuses, waiting_times
+from lib.Snapshot import Snapshot
+from lib.util import getLogger
+from lib.Waitlist import WaitlistFilter
+
+logger = getLogger(__name__)
+
+JSON = "application/json"
+ARROW = "application/vnd.apache.arrow.stream"
+
+group_columns = ['Center', 'Age', 'Waiting Time', 'Status']
+
+Params = dict[str, list[str]]
+Response = tuple[str, bytes]
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class NotFound(LookupError):
+    pass
+
+
+def _one(params: Params, name: str) -> Optional[str]:
+    values = params.get(name)
+    if not values:
+        return None
+    if len(values) > 1:
+        raise BadRequest(f"'{name}' may only be given once")
+    return values[0]
+
+
+def _range(
+    params: Params, name: str, order: list[str], default: tuple[str, str]
+) -> tuple[str, str]:
+    values = params.get(name) or list(default)
+    if len(values) == 1:
+        values = values * 2
+    if len(values) != 2:
+        raise BadRequest(f"'{name}' takes one value or a lower and upper bound")
+    for value in values:
+        if value not in order:
+            raise BadRequest(f"Unknown {name} {value!r}; expected one of {order}")
+    return values[0], values[1]
+
+
+def parse_filter(params: Params) -> WaitlistFilter:
+    radius = _one(params, 'radius_nm')
+    try:
+        radius_nm = float(radius) if radius is not None else None
+    except ValueError:
+        raise BadRequest(f"radius_nm must be a number, got {radius!r}")
+    if radius_nm is not None and not (math.isfinite(radius_nm) and radius_nm >= 0):
+        raise BadRequest(f"radius_nm must be a non-negative number, got {radius!r}")
+
+    default = WaitlistFilter()
+    return WaitlistFilter(
+        center_code=_one(params, 'center'),
+        radius_nm=radius_nm,
+        status=_range(params, 'status', statuses, default.status),
+        age=_range(params, 'age', ages, default.age),
+        waiting_time=_range(
+            params, 'waiting_time', waiting_times, default.waiting_time
+        ),
+    ).normalized()
+
+
+def _group_columns(params: Params) -> tuple[str, ...]:
+    """`group_by`, then `color_by` if given."""
+    columns = []
+    for name in ('group_by', 'color_by'):
+        value = _one(params, name)
+        if value is None and name == 'color_by':
+            break
+        if value not in group_columns:
+            raise BadRequest(f"'{name}' must be one of {group_columns}")
+        columns.append(value)
+    if len(set(columns)) < len(columns):
+        raise BadRequest("'group_by' and 'color_by' must differ")
+    return tuple(columns)
+
+
+def _encode(frame: pd.DataFrame, fmt: str) -> Response:
+    if fmt == 'arrow':
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return ARROW, sink.getvalue()
+    return JSON, frame.to_json(orient='records').encode()
+
+
+def _json(payload: object) -> Response:
+    return JSON, json.dumps(payload).encode()
+
+
+class _ResponseCache:
+    """Least recently used responses, bounded by the total size of their bodies."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._responses: OrderedDict[Hashable, Response] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Response]:
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+            return response
+
+    def put(self, key: Hashable, response: Response) -> None:
+        size = len(response[1])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if (previous := self._responses.pop(key, None)) is not None:
+                self._size -= len(previous[1])
+            self._responses[key] = response
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._responses.popitem(last=False)
+                self._size -= len(evicted[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._responses.clear()
+            self._size = 0
+
+
+class WaitlistApi:
+    """Answers filter, group-by and radius queries against the current snapshot."""
+
+    endpoints = (
+        '/snapshot',
+        '/totals',
+        '/transplants',
+        '/filter',
+        '/summary',
+        '/centers',
+    )
+
+    def __init__(self, snapshot: Callable[[], Snapshot], cache_bytes: int = 64 * 2**20):
+        self.snapshot = snapshot
+        self._cache = _ResponseCache(cache_bytes)
+        self._cached_snapshot: Optional[Snapshot] = None
+
+    def handle(self, path: str, params: Params) -> Response:
+        if path not in self.endpoints:
+            raise NotFound(f"Unknown endpoint {path}")
+
+        fmt = _one(params, 'format') or 'json'
+        if fmt not in ('json', 'arrow'):
+            raise BadRequest("'format' must be 'json' or 'arrow'")
+
+        extra = _group_columns(params) if path == '/summary' else ()
+
+        snapshot = self.snapshot()
+        if snapshot is not self._cached_snapshot:
+            self._cache.clear()
+            self._cached_snapshot = snapshot
+
+        f = parse_filter(params)
+        # a request still answering from the old snapshot may store its
+        # response after the clear, so the snapshot is part of the key too
+        key = (snapshot, _cache_key(path, f, extra, fmt))
+        if (response := self._cache.get(key)) is None:
+            response = self._respond(snapshot, path, f, extra, fmt)
+            self._cache.put(key, response)
+        return response
+
+    def _respond(
+        self,
+        snapshot: Snapshot,
+        path: str,
+        f: WaitlistFilter,
+        extra: tuple[str, ...],
+        fmt: str,
+    ) -> Response:
+        waitlist = snapshot.waitlist
+
+        if path == '/snapshot':
+            return _json(
+                {
+                    'remote_path': snapshot.report.remote_path,
+                    'retrieved': snapshot.retrieved.isoformat(),
+                }
+            )
+        if path == '/totals':
+            patients, n_centers = waitlist.totals(f)
+            return _json({'patients': patients, 'centers': n_centers})
+        if path == '/transplants':
+            if (transplants := waitlist.transplants(f)) is None:
+                raise NotFound("No transplant report is loaded")
+            waitlisted, transplanted = transplants
+            return _json(
+                {
+                    'waitlisted': waitlisted,
+                    'transplants': transplanted,
+                    'year': waitlist.transplant_year,
+                }
+            )
+        if path == '/filter':
+            return _encode(waitlist.filter(f), fmt)
+        if path == '/summary':
+            return _encode(waitlist.summarize(f, *extra), fmt)
+
+        if f.center_code is None:
+            raise BadRequest("'center' is required")
+        codes = (
+            waitlist.neighbors.within(f.center_code, f.radius_nm)
+            if f.radius_nm is not None
+            else [f.center_code]
+        )
+        return _json(codes)
+
+
+def _cache_key(
+    path: str, f: WaitlistFilter, extra: tuple[str, ...], fmt: str
+) -> Hashable:
+    """The parameters that `path` reads."""
+    if path == '/snapshot':
+        return (path,)
+    if path in ('/totals', '/transplants'):
+        return (path, f)
+    if path == '/centers':
+        return (path, f.center_code, f.radius_nm)
+    return (path, f, extra, fmt)
+
+
+def make_handler(api: WaitlistApi) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            try:
+                self._send(HTTPStatus.OK, *api.handle(url.path, parse_qs(url.query)))
+            except NotFound as e:
+                self._send(HTTPStatus.NOT_FOUND, *_json({'error': str(e)}))
+            except BadRequest as e:
+                self._send(HTTPStatus.BAD_REQUEST, *_json({'error': str(e)}))
+            except Exception:
+                logger.exception(f"Failed to answer {self.path}")
+                self._send(
+                    HTTPStatus.INTERNAL_SERVER_ERROR,
+                    *_json({'error': 'Internal server error'}),
+                )
+
+        def _send(self, status: HTTPStatus, content_type: str, body: bytes) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            logger.info(format % args)
+
+    return Handler
+
+
+def serve(api: WaitlistApi, host: str, port: int) -> None:
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    logger.info(f"Serving waitlist API on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
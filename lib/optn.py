@@ -3,10 +3,6 @@ from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select
 from tenacity import retry, wait_exponential, stop_after_attempt, RetryCallState
 
 ages_map = {
@@ -78,7 +74,12 @@ expected_waitlist_filename = (
     wait=wait_exponential(multiplier=1, min=4, max=15),
     stop=stop_after_attempt(5),
 )
-def download_transplant_report(download_dir: Path):
+def download_transplant_report(download_dir: Path, year: int):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import Select
+
     chrome_options = Options()
     prefs = {
         "download.default_directory": str(download_dir),
@@ -109,7 +110,7 @@ def download_transplant_report(download_dir: Path):
     select_organ.select_by_visible_text("Liver")
 
     select_year = Select(driver.find_element(By.ID, "slice5"))
-    select_year.select_by_visible_text("2024")
+    select_year.select_by_visible_text(str(year))
 
     select_type = Select(driver.find_element(By.ID, "slice6"))
     select_type.select_by_visible_text("Deceased Donor")
@@ -134,6 +135,11 @@ def download_transplant_report(download_dir: Path):
     stop=stop_after_attempt(5),
 )
 def download_waitlist_report(download_dir: Path):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import Select
+
     chrome_options = Options()
     prefs = {
         "download.default_directory": str(download_dir),
@@ -217,7 +223,9 @@ def process_waitlist_report(filename: Path, retrieved_dt: datetime) -> pd.DataFr
     return melted[melted['count'] > 0]
 
 
-def process_transplant_report(filename: Path, retrieved_dt: datetime) -> pd.DataFrame:
+def process_transplant_report(
+    filename: Path, retrieved_dt: datetime, year: int
+) -> pd.DataFrame:
     df = (
         pd.read_csv(filename)
         .ffill()
@@ -228,6 +236,8 @@ def process_transplant_report(filename: Path, retrieved_dt: datetime) -> pd.Data
     df['center_code'] = clean_center_code(df['center_code'])
     df['age'] = recode_age(df['age'])
 
+    df = df.loc[df['center_code'] != 'All Centers']
+
     melted = df.melt(
         id_vars=["center_code", "age"], var_name="status", value_name="count"
     )
@@ -235,5 +245,8 @@ def process_transplant_report(filename: Path, retrieved_dt: datetime) -> pd.Data
     melted['count'] = melted['count'].replace(',', '', regex=True).astype(int)
     melted['status'] = recode_status(melted['status'])
     melted['retrieved_dt'] = retrieved_dt
+    melted['year'] = year
+
+    melted.dropna(inplace=True, axis=0)
 
     return melted[melted['count'] > 0]
@@ -4,6 +4,7 @@ import logging.config
 import os
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
 
@@ -20,6 +21,7 @@ class Environment(enum.Enum):
 class Config:
     root_dir = Path(__file__).parent.parent
     data_dir = root_dir / "data"
+    snapshot_dir = data_dir / "snapshot"
 
     @property
     def env(self) -> Environment:
@@ -36,6 +38,17 @@ class Config:
             raise EnvironmentError("GCS_BUCKET is not set")
         return bucket
 
+    @property
+    def local_bucket_dir(self) -> Optional[Path]:
+        """A directory to read reports from instead of the GCS bucket."""
+        if (bucket_dir := os.getenv("LOCAL_BUCKET_DIR")) is None:
+            return None
+        return Path(bucket_dir)
+
+    @property
+    def refresh_interval_s(self) -> float:
+        return float(os.getenv("REFRESH_INTERVAL_SECONDS", "600"))
+
 
 config = Config()
 
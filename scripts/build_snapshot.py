@@ -0,0 +1,43 @@
+"""Prebuild the startup artifact the app reads instead of the bucket.
+
+The app only finds it in `data/snapshot/` of its own checkout, so this has to
+run on the serving host before `streamlit run app.py`, e.g. in the image build
+or a deploy hook, with ENVIRONMENT and GCS_BUCKET set as for the app. The
+Waitlist workflow builds one after every scrape and publishes it as the
+`snapshot` workflow artifact, which a deploy can unpack there instead.
+Without it the app still starts, loading the latest report from the bucket.
+"""
+
+from pathlib import Path
+
+from google.cloud.storage import Client as GcsClient
+
+from lib.Artifact import Artifact
+from lib.Report import ReportCollection
+from lib.util import config, getLogger
+
+logger = getLogger(__name__)
+
+
+def main(path: Path) -> None:
+    client = GcsClient()
+    collection = ReportCollection(client, client.bucket(config.gcs_bucket))
+
+    logger.info("Building startup artifact from the latest processed report")
+    Artifact.build(collection).write(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=config.snapshot_dir,
+        help="Directory to write the artifact to, replaced as a whole; "
+        "must be new, empty or hold a previous artifact",
+    )
+    args = parser.parse_args()
+
+    main(args.out)
@@ -0,0 +1,343 @@
+"""Load test the dashboard with concurrent sessions against a real server.
+
+Starts `streamlit run app.py` headless and connects `--sessions` websocket
+clients that change filters in parallel, the way the browser does, while
+sampling the server's resident memory. Run against a local bucket or a
+prebuilt snapshot, e.g.
+
+    LOCAL_BUCKET_DIR=/tmp/bucket python scripts/load_test.py --sessions 20
+"""
+
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import websocket
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Delta_pb2 import Delta
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from lib.util import config
+
+# a run triggered by a fragment widget may end early to rerun the whole app;
+# the interaction is done once a run finishes for good
+FINISHED = (
+    ForwardMsg.FINISHED_SUCCESSFULLY,
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+)
+
+
+def rss_mb(pid: int) -> float:
+    """Current resident set size of process `pid`."""
+    statm = Path(f"/proc/{pid}/statm")
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * resource.getpagesize() / 2**20
+    # kilobytes, on both Linux and macOS
+    ps = subprocess.run(
+        ["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True
+    )
+    return int(ps.stdout) / 2**10
+
+
+class PeakRss(threading.Thread):
+    """Samples the resident set size of a process until stopped."""
+
+    def __init__(self, pid: int, interval_s: float = 0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval_s = interval_s
+        self.peak = 0.0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval_s):
+            self.peak = max(self.peak, rss_mb(self.pid))
+
+    def stop(self) -> float:
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+def start_server(port: int, timeout: float) -> subprocess.Popen:
+    # the app still logs to app.log; keep the console for the report
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "streamlit",
+            "run",
+            str(config.root_dir / "app.py"),
+            "--server.headless=true",
+            f"--server.port={port}",
+            "--browser.gatherUsageStats=false",
+        ],
+        cwd=config.root_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health"):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError(f"streamlit exited with code {server.returncode}")
+            if time.monotonic() > deadline:
+                server.terminate()
+                raise TimeoutError(f"streamlit did not start within {timeout} s")
+            time.sleep(0.2)
+
+
+@dataclass
+class Widget:
+    element: Any  # the widget's proto, e.g. Selectbox or Slider
+    fragment_id: str
+
+    @property
+    def by_label(self) -> bool:
+        """Whether the server takes option labels rather than option indices.
+
+        Newer Streamlit versions send `raw_value` with the widget and expect
+        labels back.
+        """
+        return 'raw_value' in self.element.DESCRIPTOR.fields_by_name
+
+
+class ScriptError(RuntimeError):
+    pass
+
+
+class Session:
+    """A websocket client rerunning the app with its own widget values."""
+
+    def __init__(self, url: str, seed: int, timeout: float):
+        self.rng = random.Random(seed)
+        self.ws = websocket.create_connection(
+            url, subprotocols=["streamlit"], timeout=timeout
+        )
+        self.widgets: dict[str, Widget] = {}
+        self.states: dict[str, WidgetState] = {}
+
+    def rerun(self, fragment_id: str = "") -> None:
+        """Send every widget value, like the browser does, and wait for the run."""
+        msg = BackMsg()
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        self.ws.send_binary(msg.SerializeToString())
+
+        rendered: dict[str, Widget] = {}
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.ws.recv())
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                self._render(forward.delta, rendered)
+            elif kind == 'script_finished' and forward.script_finished in FINISHED:
+                break
+
+        if forward.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY:
+            # a full run shows every widget, so forget the ones that went away
+            self.widgets = rendered
+            ids = {w.element.id for w in rendered.values()}
+            self.states = {k: v for k, v in self.states.items() if k in ids}
+        else:
+            self.widgets.update(rendered)
+
+    def _render(self, delta: Delta, rendered: dict[str, Widget]) -> None:
+        kind = delta.new_element.WhichOneof('type')
+        if kind is None:
+            return
+        element = getattr(delta.new_element, kind)
+        if kind == 'exception':
+            raise ScriptError(f"{element.type}: {element.message}")
+        if getattr(element, 'id', '') and getattr(element, 'label', ''):
+            rendered[element.label] = Widget(element, delta.fragment_id)
+
+    def select(self, label: str, option: Optional[str]) -> str:
+        """Pick `option` in a selectbox, or clear it with None."""
+        widget = self.widgets[label]
+        state = WidgetState(id=widget.element.id)
+        if option is not None and widget.by_label:
+            state.string_value = option
+        elif option is not None:
+            state.int_value = list(widget.element.options).index(option)
+        self.states[state.id] = state
+        return widget.fragment_id
+
+    def select_range(self, label: str, lo: int, hi: int) -> str:
+        """Set a range select slider to the options at `lo` and `hi`."""
+        widget = self.widgets[label]
+        state = WidgetState(id=widget.element.id)
+        if widget.by_label:
+            options = widget.element.options
+            state.string_array_value.data.extend([options[lo], options[hi]])
+        else:
+            state.double_array_value.data.extend([lo, hi])
+        self.states[state.id] = state
+        return widget.fragment_id
+
+    def toggle(self, label: str) -> str:
+        widget = self.widgets[label]
+        current = self.states.get(widget.element.id)
+        value = current.bool_value if current is not None else widget.element.default
+        self.states[widget.element.id] = WidgetState(
+            id=widget.element.id, bool_value=not value
+        )
+        return widget.fragment_id
+
+    def run(
+        self, steps: int, think_s: float, latencies: list[float], errors: list[str]
+    ) -> None:
+        """Change a random filter `steps` times, timing each rerun."""
+        try:
+            for _ in range(steps):
+                time.sleep(self.rng.uniform(0, think_s))
+                fragment_id = self.rng.choice(actions)(self)
+                start = time.perf_counter()
+                self.rerun(fragment_id)
+                latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+    def close(self) -> None:
+        self.ws.close()
+
+
+# each action changes one widget and returns the fragment to rerun
+Action = Callable[[Session], str]
+
+
+def pick_center(session: Session) -> str:
+    options = session.widgets["Center"].element.options
+    return session.select("Center", session.rng.choice([None, *options[:50]]))
+
+
+def toggle_radius(session: Session) -> str:
+    label = "Include other centers in radius"
+    if label not in session.widgets:
+        return pick_center(session)
+    return session.toggle(label)
+
+
+def set_range(label: str) -> Action:
+    def action(session: Session) -> str:
+        n = len(session.widgets[label].element.options)
+        lo, hi = sorted(session.rng.sample(range(n), 2))
+        return session.select_range(label, lo, hi)
+
+    return action
+
+
+def set_column(label: str) -> Action:
+    def action(session: Session) -> str:
+        options = session.widgets[label].element.options
+        return session.select(label, session.rng.choice(options))
+
+    return action
+
+
+actions: list[Action] = [
+    pick_center,
+    toggle_radius,
+    set_range("Status"),
+    set_range("Age"),
+    set_range("Waiting Time"),
+    set_column("Group by"),
+    set_column("Color by"),
+]
+
+
+def percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def main(
+    sessions: int, steps: int, think_s: float, timeout: float, seed: int, port: int
+) -> None:
+    server = start_server(port, timeout)
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    try:
+        baseline = rss_mb(server.pid)
+        sampler = PeakRss(server.pid)
+        sampler.start()
+
+        # the first run loads the snapshot; time it on its own
+        first = Session(url, seed, timeout)
+        start = time.perf_counter()
+        first.rerun()
+        cold_start = time.perf_counter() - start
+        loaded = rss_mb(server.pid)
+
+        clients = [Session(url, seed + i + 1, timeout) for i in range(sessions)]
+        for client in clients:
+            client.rerun()
+
+        latencies: list[float] = []
+        errors: list[str] = []
+        threads = [
+            threading.Thread(
+                target=client.run, args=(steps, think_s, latencies, errors)
+            )
+            for client in clients
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        peak = max(sampler.stop(), loaded)
+
+        for client in [first, *clients]:
+            client.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"sessions           {sessions} concurrent x {steps} interactions")
+    print(f"cold start         {cold_start * 1000:.0f} ms")
+    print(f"reruns             {len(latencies)} in {elapsed:.1f} s")
+    if len(latencies) > 1:
+        print(f"rerun p50          {percentile(latencies, 50) * 1000:.0f} ms")
+        print(f"rerun p99          {percentile(latencies, 99) * 1000:.0f} ms")
+    print(f"rss before load    {baseline:.0f} MB")
+    print(f"rss after load     {loaded:.0f} MB")
+    # what each concurrent session adds on top of the loaded snapshot, at the
+    # worst moment; this is what a container has to leave room for
+    print(
+        f"rss peak           {peak:.0f} MB "
+        f"({(peak - loaded) / max(sessions, 1):+.1f} MB per session)"
+    )
+    for error in errors:
+        print(f"error              {error}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument(
+        "--think",
+        type=float,
+        default=0.0,
+        help="Upper bound in seconds of a random pause before each interaction",
+    )
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8599)
+    args = parser.parse_args()
+
+    main(args.sessions, args.steps, args.think, args.timeout, args.seed, args.port)
@@ -1,13 +1,27 @@
+import gzip
+import shutil
 import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
 from pathlib import Path
+from typing import Callable, Optional, Union
 
+import pandas as pd
 from google.cloud.storage import Client as GcsClient
 from google.cloud.storage.bucket import Bucket
+from google.cloud.storage.retry import DEFAULT_RETRY
 from tenacity import retry
 from tenacity.stop import stop_after_attempt
 from tenacity.wait import wait_exponential
 
-from lib.optn import download_waitlist_report, process_waitlist_report
+from lib.LocalStorage import LocalBucket
+from lib.optn import (
+    download_transplant_report,
+    download_waitlist_report,
+    process_transplant_report,
+    process_waitlist_report,
+)
 from lib.Report import Report, ReportKind, ReportStatus
 from lib.util import Environment, config, getLogger
 
@@ -20,37 +34,136 @@ def now():
     return datetime.now(timezone(timedelta(hours=-5), "EST"))
 
 
+# resumable uploads send the file in chunks of this size (a multiple of 256 KiB),
+# and the client retries a failed chunk rather than the whole file
+UPLOAD_CHUNK_SIZE = 8 * 256 * 1024
+
+
 @retry(
     wait=wait_exponential(multiplier=1, min=4, max=15),
     stop=stop_after_attempt(5),
 )
-def upload(bucket: Bucket, remote_path: str, local_path: str):
-    bucket.blob(remote_path).upload_from_filename(local_path)
-
-
-def main(Env: Environment):
+def upload(
+    bucket: Union[Bucket, LocalBucket],
+    remote_path: str,
+    local_path: str,
+    content_type: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+) -> None:
+    blob = bucket.blob(remote_path, chunk_size=UPLOAD_CHUNK_SIZE)
+    blob.content_encoding = content_encoding
+    blob.upload_from_filename(
+        local_path, content_type=content_type, retry=DEFAULT_RETRY
+    )
 
-    bucket = GcsClient().get_bucket(config.gcs_bucket)
-    dt = now()
 
-    raw = Report(ReportKind.WAITLIST, ReportStatus.RAW, dt, env=Env)
-    processed = Report(ReportKind.WAITLIST, ReportStatus.PROCESSED, dt, env=Env)
+def gzip_file(local_path: Path) -> Path:
+    gz_path = local_path.with_name(local_path.name + ".gz")
+    with open(local_path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    return gz_path
+
+
+def upload_raw(
+    bucket: Union[Bucket, LocalBucket], report: Report, local_path: Path
+) -> None:
+    """Store a raw CSV gzip-compressed under its usual name.
+
+    With Content-Encoding: gzip, GCS decompresses on download, so
+    `Report.download` still yields the plain CSV.
+    """
+    gz_path = gzip_file(local_path)
+    logger.info(f"Uploading {report.kind.value} raw report to {report.remote_path}")
+    upload(
+        bucket,
+        report.remote_path,
+        str(gz_path),
+        content_type="text/csv",
+        content_encoding="gzip",
+    )
 
-    with tempfile.TemporaryDirectory() as temp_dir:
 
-        logger.info(f"Downloading raw waitlist report to {temp_dir}")
-        local_path = download_waitlist_report(Path(temp_dir))
-        logger.info(f"Uploading raw waitlist report to {raw.remote_path}")
-        upload(bucket, raw.remote_path, str(local_path))
+def upload_processed(
+    bucket: Union[Bucket, LocalBucket], report: Report, local_path: Path
+) -> None:
+    logger.info(
+        f"Uploading {report.kind.value} processed report to {report.remote_path}"
+    )
+    upload(
+        bucket,
+        report.remote_path,
+        str(local_path),
+        content_type="application/vnd.apache.parquet",
+    )
 
-        logger.info(f"Processing waitlist report")
-        processed_df = process_waitlist_report(local_path, dt)
-        processed_path = tempfile.mkstemp(dir=temp_dir, suffix=".parquet")[1]
-        logger.info(f"Writing processed waitlist report to {processed_path}")
-        processed_df.to_parquet(processed_path)
 
-        logger.info(f"Uploading processed waitlist report to {processed.remote_path}")
-        upload(bucket, processed.remote_path, processed_path)
+def scrape(
+    pool: ThreadPoolExecutor,
+    bucket: Union[Bucket, LocalBucket],
+    kind: ReportKind,
+    download: Callable[[Path], Path],
+    process: Callable[[Path, datetime], pd.DataFrame],
+    dt: datetime,
+    Env: Environment,
+    temp_dir: Path,
+) -> list[Future]:
+    """Download and process one report, uploading both versions in the pool."""
+    raw = Report(kind, ReportStatus.RAW, dt, env=Env)
+    processed = Report(kind, ReportStatus.PROCESSED, dt, env=Env)
+
+    logger.info(f"Downloading raw {kind.value} report to {temp_dir}")
+    local_path = download(temp_dir)
+    uploads = [pool.submit(upload_raw, bucket, raw, local_path)]
+
+    logger.info(f"Processing {kind.value} report")
+    processed_df = process(local_path, dt)
+    processed_path = Path(tempfile.mkstemp(dir=temp_dir, suffix=".parquet")[1])
+    logger.info(f"Writing processed {kind.value} report to {processed_path}")
+    processed_df.to_parquet(processed_path)
+    uploads.append(pool.submit(upload_processed, bucket, processed, processed_path))
+
+    return uploads
+
+
+def main(
+    Env: Environment,
+    bucket_dir: Optional[Path] = None,
+    transplant_year: Optional[int] = None,
+) -> None:
+
+    bucket: Union[Bucket, LocalBucket]
+    if bucket_dir is not None:
+        bucket = LocalBucket.from_dir(bucket_dir)
+    else:
+        bucket = GcsClient().get_bucket(config.gcs_bucket)
+    dt = now()
+    # transplant counts are per calendar year; default to the last complete one
+    year = transplant_year if transplant_year is not None else dt.year - 1
+
+    with tempfile.TemporaryDirectory() as temp_dir, ThreadPoolExecutor() as pool:
+        uploads = scrape(
+            pool,
+            bucket,
+            ReportKind.WAITLIST,
+            download_waitlist_report,
+            process_waitlist_report,
+            dt,
+            Env,
+            Path(temp_dir),
+        )
+        uploads += scrape(
+            pool,
+            bucket,
+            ReportKind.TRANSPLANT,
+            partial(download_transplant_report, year=year),
+            partial(process_transplant_report, year=year),
+            dt,
+            Env,
+            Path(temp_dir),
+        )
+
+        for future in uploads:
+            future.result()
 
 
 if __name__ == "__main__":
@@ -62,8 +175,20 @@ if __name__ == "__main__":
         action="store_true",
         help="Run in production mode",
     )
+    parser.add_argument(
+        "--bucket-dir",
+        type=Path,
+        default=None,
+        help="Upload to this directory instead of the GCS bucket",
+    )
+    parser.add_argument(
+        "--transplant-year",
+        type=int,
+        default=None,
+        help="Year of transplants to download, by default the last complete one",
+    )
     args = parser.parse_args()
 
     env = Environment.PROD if args.prod else Environment.DEV
 
-    main(env)
+    main(env, args.bucket_dir, args.transplant_year)
@@ -0,0 +1,60 @@
+from pathlib import Path
+from typing import Optional
+
+from lib.api import WaitlistApi, serve
+from lib.Center import read_centers
+from lib.LocalStorage import LocalBucket
+from lib.Report import ReportCollection, ReportKind
+from lib.Snapshot import Snapshot
+from lib.util import config, getLogger
+from lib.Waitlist import NeighborIndex, Waitlist
+
+logger = getLogger(__name__)
+
+
+def report_collection(bucket_dir: Optional[Path]) -> ReportCollection:
+    if bucket_dir is not None:
+        bucket = LocalBucket.from_dir(bucket_dir)
+        return ReportCollection(bucket.client, bucket)
+
+    from google.cloud.storage import Client as GcsClient
+
+    client = GcsClient()
+    return ReportCollection(client, client.bucket(config.gcs_bucket))
+
+
+def main(host: str, port: int, bucket_dir: Optional[Path]) -> None:
+    collection = report_collection(bucket_dir)
+    centers = read_centers()
+    neighbors = NeighborIndex.read([c.code for c in centers])
+
+    report = collection.find_latest_report()
+    logger.info(f"Loading {report.remote_path}")
+    snapshot = Snapshot(
+        report,
+        Waitlist.from_processed(
+            collection.read_processed_report(report),
+            centers,
+            neighbors,
+            collection.get_latest_processed(ReportKind.TRANSPLANT),
+        ),
+    )
+
+    serve(WaitlistApi(lambda: snapshot), host, port)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--bucket-dir",
+        type=Path,
+        default=None,
+        help="Read reports from this directory instead of the GCS bucket",
+    )
+    args = parser.parse_args()
+
+    main(args.host, args.port, args.bucket_dir)